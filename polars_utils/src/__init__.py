@@ -1,3 +1,3 @@
-from .mappings import move_col, map_col
+from .mappings import move_col, map_col, map_cols, as_batched, clear_mapping_cache
 
-__all__ = ['map_col', 'move_col']
+__all__ = ['map_col', 'map_cols', 'move_col', 'as_batched', 'clear_mapping_cache']
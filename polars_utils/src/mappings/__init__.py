@@ -1,4 +1,5 @@
-from .map_col import map_col
+from .map_col import map_col, as_batched, clear_mapping_cache
+from .map_cols import map_cols
 from .move_col import move_col
 
-__all__ = ['map_col', 'move_col']
+__all__ = ['map_col', 'map_cols', 'move_col', 'as_batched', 'clear_mapping_cache']
@@ -1,13 +1,50 @@
-from typing import Union, List, Dict, Any, Callable
-
+import ast
+import builtins
+import inspect
+import math
+import operator
+import os
+import textwrap
+from collections import abc
+from functools import lru_cache, wraps
+from typing import Union, List, Dict, Any, Callable, Optional, Tuple
+
+import numpy as np
 import polars as pl
 
+_HAS_REPLACE_STRICT = hasattr(pl.Expr, 'replace_strict')  # polars >= 1.0
+_HAS_REPLACE = hasattr(pl.Expr, 'replace')  # polars >= 0.19.16
+_HAS_GATHER = hasattr(pl.Expr, 'gather')  # polars >= 0.19.14
+
+# operators and functions that can be translated from a mapping function to an expression
+_EXPR_BINARY_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub,
+                          ast.Mult: operator.mul, ast.Div: operator.truediv}
+_EXPR_UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+_EXPR_FUNCTIONS = {
+    abs: pl.Expr.abs, np.abs: pl.Expr.abs,
+    math.sqrt: pl.Expr.sqrt, np.sqrt: pl.Expr.sqrt,
+    math.exp: pl.Expr.exp, np.exp: pl.Expr.exp,
+    np.log: pl.Expr.log, np.log10: pl.Expr.log10,
+    math.sin: pl.Expr.sin, np.sin: pl.Expr.sin,
+    math.cos: pl.Expr.cos, np.cos: pl.Expr.cos,
+    math.tan: pl.Expr.tan, np.tan: pl.Expr.tan,
+}
+
+# integer dtypes with their width in bits
+_INT_BITS = [(pl.Int8, 8), (pl.UInt8, 8), (pl.Int16, 16), (pl.UInt16, 16),
+             (pl.Int32, 32), (pl.UInt32, 32), (pl.Int64, 64), (pl.UInt64, 64)]
+
 
 def map_col(
-        df: pl.DataFrame,
+        df: Union[pl.DataFrame, pl.LazyFrame],
         map_from: Union[str, List[str]], map_to: Union[str, List[str]],
         mapping: Union[Dict[Any, Any], Callable[[Any], Any]],
-        default: Any = None) -> pl.DataFrame:
+        default: Any = None,
+        jit: bool = False,
+        batched: bool = False,
+        unique_only: bool = False,
+        streaming: bool = False,
+        translate: bool = False) -> Union[pl.DataFrame, pl.LazyFrame]:
     """
     Map values in column to new values using dictionary or mapping function
 
@@ -30,8 +67,66 @@ def map_col(
     ```def map_func(*args):
         return 2*args[0] + args[1] / args[2]```
 
+    When mapping multiple columns to multiple columns, the function is called once with
+    a numpy array for each column to map from and must return a tuple with a numpy
+    array for each column to map to, in the correct order. Rows with a null in any of
+    the columns to map from are null in all columns mapped to.
+
+    Example:
+    ```def map_func(a, b):
+        return a + b, a * b```
+
+    Numeric mapping functions can be compiled with numba by passing `jit=True`. When
+    mapping a single column, the compiled function is applied to each value on
+    multiple threads. When mapping multiple columns, the compiled function is called
+    once with a numpy array for each column, so it must work on arrays, as the example
+    above does. Its loops and array expressions are then run in parallel. If numba cannot
+    compile the function, it is called without compiling it.
+
+    When mapping a single column with `batched=True`, the function is called once with
+    the whole column as a `pl.Series` instead of once per value. Functions written for
+    whole columns, e.g. using numpy ufuncs or polars series methods, are much faster
+    than functions called per value. `as_batched` wraps a function taking a single
+    value so it can be passed with `batched=True`, but writing the function for whole
+    columns is preferred.
+
+    Example:
+    ```def map_func(s):
+        return np.log1p(s)```
+
+    When mapping a numeric column with a function doing arithmetic only, e.g.
+    `lambda x: 2 * abs(x) + 1`, pass `translate=True` to translate the function to a
+    polars expression, so it is not called at all. Integer columns are mapped as Int64
+    and float columns as Float64. Unlike Python ints, Int64 values wrap around when they
+    overflow, and where the function would raise, e.g. when dividing by zero, the
+    expression returns inf or NaN instead. Functions that cannot be translated are
+    called as usual.
+
+    When the columns to map from contain many duplicate values, pass `unique_only=True`
+    to call the function only once per unique value (or combination of values) and
+    join the results back onto the dataframe.
+
+    When df is a LazyFrame, the mapping is added to its query and a LazyFrame is
+    returned. Chaining calls to map_col on a LazyFrame lets polars optimize all
+    mappings together and evaluate them in a single pass when the result is collected,
+    instead of materializing a dataframe after each mapping.
+
+    Example:
+    ```map_col(df.lazy(), 'a', 'b', mapping).pipe(map_col, 'b', 'c', func).collect()```
+
+    For very large dataframes, pass `streaming=True` to run the mapping with the
+    streaming engine of polars, which processes the dataframe in chunks instead of
+    holding all intermediate columns in memory at once.
+
+    When mapping an integer column with a dictionary whose keys are a contiguous range of
+    integers, e.g. `{0: 'a', 1: 'b', 2: 'c'}`, the values are looked up by position
+    instead of by hashing the keys.
+
+    When mapping a categorical column with a dictionary, the dictionary is applied to the
+    categories, and the values are looked up by the physical code of each value.
+
     :param df: The dataframe
-    :type df: pl.DataFrame
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
     :param map_from: the name or names of the column(s) to map from (in correct order)
     :type map_from: Union[str, List[str]]
     :param map_to:  the name or names of the column(s) to be created as a result of the mapping
@@ -40,54 +135,170 @@ def map_col(
     :type mapping: Union[Dict[Any, Any], Callable[[Any], Any]]
     :param default: the default value to use if no match is found in the dictionary
     :type default: Any
-    :return: the dataframe with the new column
-    :rtype: pl.DataFrame
-    :raises: ValueError: if map_from is a list and mapping is a dictionary
+    :param jit: whether to compile the mapping function with numba
+    :type jit: bool
+    :param batched: whether to call the mapping function once with the whole column
+    :type batched: bool
+    :param unique_only: whether to call the mapping function only on unique values
+    :type unique_only: bool
+    :param streaming: whether to run the mapping with the streaming engine, ignored if df is
+        lazy, as the LazyFrame is returned without collecting it
+    :type streaming: bool
+    :param translate: whether to translate a mapping function doing arithmetic to an expression
+    :type translate: bool
+    :return: the dataframe with the new column, lazy if df is lazy
+    :rtype: Union[pl.DataFrame, pl.LazyFrame]
+    :raises: ValueError: if map_from is a list and mapping is a dictionary, or the types of
+        map_from, map_to and mapping cannot be combined
     """
-    if isinstance(mapping, dict):
-        if isinstance(map_from, list):  # multiple columns
+    expr = _map_expr(df=df, map_from=map_from, map_to=map_to, mapping=mapping,
+                     default=default, jit=jit, batched=batched, unique_only=unique_only,
+                     translate=translate)
+
+    if streaming and isinstance(df, pl.DataFrame):
+        return _with_mapped_columns(df.lazy(), [(expr, map_to)]).collect(streaming=True)
+    return _with_mapped_columns(df, [(expr, map_to)])
+
+
+def _map_expr(df: Union[pl.DataFrame, pl.LazyFrame],
+              map_from: Union[str, List[str]], map_to: Union[str, List[str]],
+              mapping: Union[Dict[Any, Any], Callable[[Any], Any]],
+              default: Any = None,
+              jit: bool = False,
+              batched: bool = False,
+              unique_only: bool = False,
+              translate: bool = False) -> pl.Expr:
+    """
+    Build the expression mapping values in column to new values
+
+    Helper function for map_col and map_cols, selecting the helper function for the
+    kind of mapping and the number of columns to map from and to.
+
+    :param df: The dataframe
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
+    :param map_from: the name or names of the column(s) to map from (in correct order)
+    :type map_from: Union[str, List[str]]
+    :param map_to:  the name or names of the column(s) to be created as a result of the mapping
+    :type map_to: Union[str, List[str]]
+    :param mapping: a dictionary or function to mapping with
+    :type mapping: Union[Dict[Any, Any], Callable[[Any], Any]]
+    :param default: the default value to use if no match is found in the dictionary
+    :type default: Any
+    :param jit: whether to compile the mapping function with numba
+    :type jit: bool
+    :param batched: whether to call the mapping function once with the whole column
+    :type batched: bool
+    :param unique_only: whether to call the mapping function only on unique values
+    :type unique_only: bool
+    :param translate: whether to translate a mapping function doing arithmetic to an expression
+    :type translate: bool
+    :return: the expression creating the new column(s)
+    :rtype: pl.Expr
+    :raises: ValueError: if map_from is a list and mapping is a dictionary, or the types of
+        map_from, map_to and mapping cannot be combined
+    """
+    helper, option_names = _select_helper(type(mapping), type(map_from), type(map_to))
+    options = {'default': default, 'jit': jit, 'batched': batched, 'unique_only': unique_only,
+               'translate': translate}
+    return helper(df, map_from, map_to, mapping, **{name: options[name] for name in option_names})
+
+
+@lru_cache(maxsize=16)
+def _select_helper(mapping_type: type, from_type: type,
+                   to_type: type) -> Tuple[Callable[..., pl.Expr], Tuple[str, ...]]:
+    """
+    Select the helper function for the types of mapping, map_from and map_to
+
+    Helper function for _map_expr. The selection is cached, as map_col is often called
+    repeatedly with arguments of the same types.
+
+    :param mapping_type: the type of the dictionary or function to map with
+    :type mapping_type: type
+    :param from_type: the type of map_from
+    :type from_type: type
+    :param to_type: the type of map_to
+    :type to_type: type
+    :return: the helper function and the names of the options it takes
+    :rtype: Tuple[Callable[..., pl.Expr], Tuple[str, ...]]
+    :raises: ValueError: if from_type is a list and mapping_type is a dictionary, or the
+        types cannot be combined
+    """
+    kind = dict if issubclass(mapping_type, dict) \
+        else abc.Callable if issubclass(mapping_type, abc.Callable) else None
+    key = (kind, _col_names_kind(from_type), _col_names_kind(to_type))
+    if key not in _DISPATCH:
+        if kind is dict and key[1] is list:  # multiple columns
             raise ValueError('When mapping with a dictionary, map_from must be a '
                              'single column and not a list of columns.')
-        return _map_col_dict(df=df,
-                             col_name=map_from, new_col_name=map_to,
-                             dictionary=mapping, default=default
-                             )
-    elif callable(mapping):
-        if isinstance(map_from, str):  # 1 to ...
-            if isinstance(map_to, str):  # 1 to 1
-                return _map_1to1_function(df=df,
-                                          col_name=map_from, new_col_name=map_to,
-                                          function=mapping
-                                          )
-            elif isinstance(map_to, list):  # 1 to n
-                return _map_1ton_function(df=df,
-                                          col_name=map_from, new_col_names=map_to,
-                                          function=mapping
-                                          )
-
-        elif isinstance(map_from, list):  # n to ...
-            if isinstance(map_to, str):  # n to 1
-                return _map_nto1_function(df=df,
-                                          col_names=map_from, new_col_name=map_to,
-                                          function=mapping
-                                          )
-            elif isinstance(map_to, list):  # m to n
-                return _map_ntom_function(df=df,
-                                          col_names=map_from, new_col_names=map_to,
-                                          function=mapping
-                                          )
-
-
-def _map_col_dict(df: pl.DataFrame,
+        raise ValueError(f'Cannot map from {from_type.__name__} to '
+                         f'{to_type.__name__} with {mapping_type.__name__}.')
+    return _DISPATCH[key]
+
+
+def _with_mapped_columns(df: Union[pl.DataFrame, pl.LazyFrame],
+                         mapped: List[Tuple[pl.Expr, Union[str, List[str]]]]
+                         ) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """
+    Add the columns created by mapping expressions to the dataframe
+
+    Helper function for map_col and map_cols. All expressions are evaluated in a single
+    `with_columns`. When mapping to multiple columns, the expression creates a struct
+    with a field for each new column, which is split into the new columns. The struct
+    is unnested under temporary names, as the dtypes of its fields are only known once
+    it is evaluated and new columns may replace existing ones.
+
+    :param df: The dataframe
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
+    :param mapped: the expressions returned by _map_expr, each with the name or names of
+        the column(s) it creates
+    :type mapped: List[Tuple[pl.Expr, Union[str, List[str]]]]
+    :return: the dataframe with the new columns
+    :rtype: Union[pl.DataFrame, pl.LazyFrame]
+    """
+    exprs, struct_col_names, tmp_col_names = [], [], {}
+    for i, (expr, new_col_names) in enumerate(mapped):
+        if isinstance(new_col_names, str):
+            exprs.append(expr)
+            continue
+        struct_col_names.append(f'__s{i}')
+        tmp_names = [f'__s{i}_{name}' for name in new_col_names]
+        tmp_col_names.update(zip(tmp_names, new_col_names))
+        exprs.append(expr.struct.rename_fields(tmp_names).alias(struct_col_names[-1]))
+
+    df = df.with_columns(exprs)
+    if not struct_col_names:
+        return df
+
+    return df.unnest(struct_col_names).with_columns(
+        [pl.col(tmp).alias(name) for tmp, name in tmp_col_names.items()]
+    ).drop(list(tmp_col_names))
+
+
+def _col_names_kind(col_names_type: type) -> Optional[type]:
+    """
+    Get whether a type names a single column or a list of columns
+
+    Helper function for _select_helper, so subclasses, e.g. `np.str_`, are accepted.
+
+    :param col_names_type: the type of map_from or map_to
+    :type col_names_type: type
+    :return: str, list, or None if the type names neither
+    :rtype: Optional[type]
+    """
+    return str if issubclass(col_names_type, str) \
+        else list if issubclass(col_names_type, list) else None
+
+
+def _map_col_dict(df: Union[pl.DataFrame, pl.LazyFrame],
                   col_name: str, new_col_name: str,
-                  dictionary: Dict[Any, Any], default: Any = None) -> pl.DataFrame:
+                  dictionary: Dict[Any, Any], default: Any = None) -> pl.Expr:
     """
     Map values in column to new values using dictionary
 
     Helper function for map_col
 
     :param df: The dataframe
-    :type df: pl.DataFrame
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
     :param col_name: the name of the column to map from
     :type col_name: str
     :param new_col_name: name of the new column to be created as a result of the mapping
@@ -96,104 +307,660 @@ def _map_col_dict(df: pl.DataFrame,
     :type dictionary: Dict[Any, Any]
     :param default: the default value to use if no match is found in the dictionary
     :type default: Any
-    :return: the dataframe with the new column
+    :return: the expression creating the new column
+    :rtype: pl.Expr
+    """
+    keys, values = tuple(dictionary.keys()), tuple(dictionary.values())
+    if _is_local_categorical(df.schema[col_name]):
+        return _map_categorical(col_name=col_name, dictionary=dictionary,
+                                default=default).alias(new_col_name)
+
+    key_dtype = df.schema[col_name]
+    if key_dtype == pl.Categorical:  # with the global string cache, map the strings
+        key_dtype = pl.Utf8
+    types = tuple(map(type, keys + values))
+    try:
+        hash(values)
+    except TypeError:  # unhashable values cannot be cached
+        build_mapping_df = _build_mapping_df.__wrapped__
+    else:
+        build_mapping_df = _build_mapping_df
+    mapping_df = build_mapping_df(keys=keys, values=values, key_dtype=key_dtype,
+                                  types=types)
+
+    first_key = _int_range_start(df=df, col_name=col_name, keys=keys)
+    if first_key is not None and len(mapping_df) == len(keys):
+        # look up values by position instead of hashing, unless keys were dropped
+        lookup = mapping_df.sort('__k')['__v']
+        index = pl.col(col_name).cast(pl.Int64, strict=False) - first_key
+        return pl.when(
+            index.is_between(0, len(lookup) - 1)
+        ).then(
+            pl.lit(lookup).gather(index.clip(0, len(lookup) - 1))
+        ).otherwise(
+            pl.lit(default)
+        ).alias(new_col_name)
+
+    col = pl.col(col_name)
+    if key_dtype != df.schema[col_name]:
+        col = col.cast(key_dtype)
+    if _HAS_REPLACE_STRICT:
+        expr = col.replace_strict(mapping_df['__k'], mapping_df['__v'], default=default)
+    elif _HAS_REPLACE:
+        expr = col.replace(mapping_df['__k'], mapping_df['__v'], default=default)
+    else:  # polars < 0.19.16
+        expr = col.map_dict(dict(zip(mapping_df['__k'], mapping_df['__v'])), default=default)
+
+    return expr.alias(new_col_name)
+
+
+def _is_local_categorical(dtype: pl.PolarsDataType) -> bool:
+    """
+    Check whether a dtype is categorical with physical codes indexing its categories
+
+    Helper function for _map_col_dict. When the global string cache is enabled, the
+    physical codes index the cache instead of the categories of the column.
+
+    :param dtype: the dtype of the column to map from
+    :type dtype: pl.PolarsDataType
+    :return: whether values of the column can be looked up by their physical code
+    :rtype: bool
+    """
+    return dtype == pl.Categorical and not pl.using_string_cache()
+
+
+def _map_categorical(col_name: str,
+                     dictionary: Dict[Any, Any], default: Any = None) -> pl.Expr:
+    """
+    Map values in a categorical column to new values using dictionary
+
+    Helper function for _map_col_dict. The dictionary is only applied to the categories
+    of the column. The values are then looked up by their physical code, so no string
+    is hashed per row.
+
+    :param col_name: the name of the column to map from
+    :type col_name: str
+    :param dictionary: a dictionary to mapping with
+    :type dictionary: Dict[Any, Any]
+    :param default: the default value to use if no match is found in the dictionary
+    :type default: Any
+    :return: the expression mapping the column
+    :rtype: pl.Expr
+    """
+    def by_code(s: pl.Series) -> pl.Series:
+        categories = s.cat.get_categories()
+        # the last value is used for nulls, which have no code
+        lookup = pl.Series([dictionary.get(category, default) for category in categories]
+                           + [default])
+        return lookup.gather(s.to_physical().fill_null(len(categories)))
+
+    return pl.col(col_name).map_batches(by_code)
+
+
+def _int_range_start(df: Union[pl.DataFrame, pl.LazyFrame], col_name: str,
+                     keys: Tuple[Any, ...]) -> Optional[int]:
+    """
+    Find the first key if the keys of a dictionary are a contiguous range of integers
+
+    Helper function for _map_col_dict. Values of an integer column can then be mapped by
+    looking them up by position, which is cheaper than hashing them.
+
+    :param df: The dataframe
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
+    :param col_name: the name of the column to map from
+    :type col_name: str
+    :param keys: the keys of the dictionary
+    :type keys: Tuple[Any, ...]
+    :return: the smallest key, or None if the keys are not a contiguous range of integers
+        or the column is not an integer column
+    :rtype: Optional[int]
+    """
+    if not _HAS_GATHER or not keys or _int_bits(df.schema[col_name]) is None:
+        return None
+    if not all(isinstance(key, int) for key in keys):
+        return None
+
+    first_key, last_key = min(keys), max(keys)
+    if first_key < -2 ** 63 or last_key >= 2 ** 63:  # the values are looked up as Int64
+        return None
+    return first_key if last_key - first_key + 1 == len(keys) else None
+
+
+def _int_bits(dtype: pl.PolarsDataType) -> Optional[int]:
+    """
+    Get the width in bits of an integer dtype
+
+    :param dtype: the dtype
+    :type dtype: pl.PolarsDataType
+    :return: the width in bits, or None if dtype is not an integer dtype
+    :rtype: Optional[int]
+    """
+    return next((bits for int_dtype, bits in _INT_BITS if dtype == int_dtype), None)
+
+
+@lru_cache(maxsize=32)
+def _build_mapping_df(keys: Tuple[Any, ...], values: Tuple[Any, ...],
+                      key_dtype: pl.PolarsDataType, types: Tuple[type, ...]) -> pl.DataFrame:
+    """
+    Build the two column (keys, values) dataframe used to map with a dictionary
+
+    Helper function for _map_col_dict. The keys are converted to the dtype of the column
+    to map from, so polars does not need to cast them when mapping. Keys that change in
+    the conversion, e.g. the int `1` for a string column, cannot match any value of the
+    column and are dropped, as is the key None, as nulls are mapped to the default. The
+    result is cached, so mapping with the same dictionary repeatedly only builds the
+    dataframe once.
+
+    :param keys: the keys of the dictionary
+    :type keys: Tuple[Any, ...]
+    :param values: the values of the dictionary, in the same order as the keys
+    :type values: Tuple[Any, ...]
+    :param key_dtype: the dtype of the column to map from
+    :type key_dtype: pl.PolarsDataType
+    :param types: the types of the keys and values, only used as part of the cache key, as
+        equal values of different types, e.g. `1`, `1.0` and `True`, have equal hashes
+    :type types: Tuple[type, ...]
+    :return: the dataframe with the columns `__k` and `__v`
     :rtype: pl.DataFrame
     """
-    return df.with_columns(
-        pl.col(col_name).map_dict(dictionary, default=default).alias(new_col_name)
-    )
+    converted = _convert_keys(keys=keys, key_dtype=key_dtype)
+    kept = pl.Series([key is not None and new_key == key
+                      for new_key, key in zip(converted, keys)],
+                     dtype=pl.Boolean)
+    return pl.DataFrame([
+        pl.Series('__k', converted, dtype=key_dtype),
+        pl.Series('__v', values),
+    ]).filter(kept)
 
 
-def _map_1to1_function(df: pl.DataFrame,
+def _convert_keys(keys: Tuple[Any, ...], key_dtype: pl.PolarsDataType) -> List[Any]:
+    """
+    Convert the keys of a dictionary to the dtype of the column to map from
+
+    Helper function for _build_mapping_df. Keys of each type are converted together, as
+    polars cannot build a series of the dtype from keys of mixed types.
+
+    :param keys: the keys of the dictionary
+    :type keys: Tuple[Any, ...]
+    :param key_dtype: the dtype of the column to map from
+    :type key_dtype: pl.PolarsDataType
+    :return: the converted keys, in the same order, with None for keys that cannot be
+        converted
+    :rtype: List[Any]
+    """
+    converted = [None] * len(keys)
+    for key_type in set(map(type, keys)):
+        positions = [i for i, key in enumerate(keys) if type(key) is key_type]
+        try:
+            group = pl.Series([keys[i] for i in positions], strict=False)
+            group = group.cast(key_dtype, strict=False).to_list()
+        except (TypeError, ValueError, ArithmeticError, pl.exceptions.ComputeError):
+            continue
+        for i, key in zip(positions, group):
+            converted[i] = key
+    return converted
+
+
+def clear_mapping_cache() -> None:
+    """
+    Clear the cache of dataframes built from dictionaries passed to map_col
+
+    Mapping with the same dictionary repeatedly reuses the dataframe built the first
+    time. Clear the cache to free the memory held by these dataframes.
+    """
+    _build_mapping_df.cache_clear()
+
+
+def _map_1to1_function(df: Union[pl.DataFrame, pl.LazyFrame],
                        col_name: str, new_col_name: str,
-                       function: Callable[[Any], Any]) -> pl.DataFrame:
+                       function: Callable[[Any], Any],
+                       jit: bool = False, batched: bool = False,
+                       unique_only: bool = False, translate: bool = False) -> pl.Expr:
     """
     Map values in column to new values using function
 
     Helper function for map_col
 
     :param df: The dataframe
-    :type df: pl.DataFrame
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
     :param col_name: the name of the column to map from
     :type col_name: str
     :param new_col_name: name of the new column to be created as a result of the mapping
     :type new_col_name: str
     :param function: a function to mapping with
     :type function: Callable[[Any], Any]
-    :return: the dataframe with the new column
-    :rtype: pl.DataFrame
+    :param jit: whether to compile the function with numba
+    :type jit: bool
+    :param batched: whether to call the function once with the whole column
+    :type batched: bool
+    :param unique_only: whether to call the function only on unique values
+    :type unique_only: bool
+    :param translate: whether to translate the function to an expression if possible
+    :type translate: bool
+    :return: the expression creating the new column
+    :rtype: pl.Expr
     """
-    return df.with_columns(
-        pl.col(col_name).apply(function).alias(new_col_name)
-    )
+    if jit:
+        expr = pl.col(col_name).apply(_jit_kernel(function), strategy='threading')
+    elif batched:
+        expr = pl.col(col_name).map_batches(function)
+    else:
+        expr = _expr_from_function(df=df, col_name=col_name, function=function) \
+            if translate else None
+        if expr is not None:  # no function is called, so there is nothing to memoize
+            return expr.alias(new_col_name)
+        expr = pl.col(col_name).apply(function)
+
+    if unique_only:
+        expr = _map_unique(col_names=[col_name], expr=expr)
+    return expr.alias(new_col_name)
+
+
+def _expr_from_function(df: Union[pl.DataFrame, pl.LazyFrame],
+                        col_name: str,
+                        function: Callable[[Any], Any]) -> Optional[pl.Expr]:
+    """
+    Translate a function doing arithmetic on a numeric value to a polars expression
 
+    Helper function for _map_1to1_function. The source of the function is parsed and
+    translated if it is a lambda or a function with a single return statement, using
+    only its argument, numbers, `+`, `-`, `*`, `/` and the functions in
+    `_EXPR_FUNCTIONS`. The column is cast to Int64 or Float64 first, like Python ints
+    and floats. UInt64 columns, which do not fit into Int64, are not translated, and
+    neither are integer constants outside the range of Int64. Unlike the function, the
+    expression does not raise, e.g. when dividing by zero, and Int64 values wrap around
+    when they overflow, following polars.
 
-def _map_1ton_function(df: pl.DataFrame,
+    :param df: The dataframe
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
+    :param col_name: the name of the column to map from
+    :type col_name: str
+    :param function: a function to mapping with
+    :type function: Callable[[Any], Any]
+    :return: the expression equivalent to the function, or None if it cannot be translated
+    :rtype: Optional[pl.Expr]
+    """
+    dtype = df.schema[col_name]
+    if dtype in (pl.Float32, pl.Float64):
+        col = pl.col(col_name).cast(pl.Float64)
+    elif _int_bits(dtype) is not None and dtype != pl.UInt64:
+        col = pl.col(col_name).cast(pl.Int64)
+    else:
+        return None
+    if isinstance(function, abc.Hashable) and function in _EXPR_FUNCTIONS:
+        return _EXPR_FUNCTIONS[function](col)
+
+    code = getattr(function, '__code__', None)
+    if code is None or code.co_argcount != 1 or code.co_kwonlyargcount \
+            or code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS):
+        return None
+    if hasattr(function, '__wrapped__'):  # the source would be that of the wrapped function
+        return None
+    try:
+        source_file = inspect.getsourcefile(function)
+        lines, first_line = inspect.getsourcelines(function)
+        tree = ast.parse(textwrap.dedent(''.join(lines)))
+    except (OSError, TypeError, SyntaxError):
+        return None
+    if source_file is None \
+            or os.path.abspath(source_file) != os.path.abspath(code.co_filename):
+        return None
+
+    def line(node: ast.AST) -> int:
+        return node.lineno + first_line - 1
+
+    arg_name = code.co_varnames[0]
+    if function.__name__ == '<lambda>':
+        bodies = [node.body for node in ast.walk(tree) if isinstance(node, ast.Lambda)
+                  and [arg.arg for arg in node.args.args] == [arg_name]
+                  and line(node) == code.co_firstlineno]
+    else:
+        bodies = [node.body[-1].value for node in ast.walk(tree)
+                  if isinstance(node, ast.FunctionDef) and node.name == function.__name__
+                  and code.co_firstlineno in [line(n) for n in [node] + node.decorator_list]
+                  and len(node.body) == 1 and isinstance(node.body[-1], ast.Return)
+                  and node.body[-1].value is not None]
+    if len(bodies) != 1:  # e.g. multiple lambdas on the same line
+        return None
+
+    namespace = {**vars(builtins), **function.__globals__,
+                 **inspect.getclosurevars(function).nonlocals}
+
+    def translate(node: ast.AST) -> Any:
+        if isinstance(node, ast.Name) and node.id == arg_name:
+            return col
+        if isinstance(node, ast.BinOp) and type(node.op) in _EXPR_BINARY_OPERATORS:
+            return number(_EXPR_BINARY_OPERATORS[type(node.op)](translate(node.left),
+                                                                 translate(node.right)))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _EXPR_UNARY_OPERATORS:
+            return number(_EXPR_UNARY_OPERATORS[type(node.op)](translate(node.operand)))
+        if isinstance(node, ast.Call) and len(node.args) == 1 and not node.keywords:
+            func = _EXPR_FUNCTIONS.get(resolve(node.func))
+            if func is not None:
+                return func(_as_expr(translate(node.args[0])))
+        return number(resolve(node))
+
+    def number(value: Any) -> Any:
+        if isinstance(value, (pl.Expr, float)):
+            return value
+        if isinstance(value, int) and not isinstance(value, bool) \
+                and -2 ** 63 <= value < 2 ** 63:  # larger ints do not fit into Int64
+            return value
+        raise ValueError(f'Cannot translate {value!r} to an expression.')
+
+    def resolve(node: ast.AST) -> Any:
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name) and node.id != arg_name:
+            return namespace.get(node.id)
+        if isinstance(node, ast.Attribute):
+            return getattr(resolve(node.value), node.attr, None)
+        return None
+
+    try:
+        expr = translate(bodies[0])
+    except (ValueError, TypeError, ArithmeticError):  # e.g. `x + 1 / 0`
+        return None
+    return expr if isinstance(expr, pl.Expr) else None
+
+
+def _as_expr(value: Any) -> pl.Expr:
+    """
+    Wrap a number in a literal expression, leaving expressions unchanged
+
+    :param value: a number or an expression
+    :type value: Any
+    :return: the expression
+    :rtype: pl.Expr
+    """
+    return value if isinstance(value, pl.Expr) else pl.lit(value)
+
+
+def _map_1ton_function(df: Union[pl.DataFrame, pl.LazyFrame],
                        col_name: str, new_col_names: List[str],
-                       function: Callable[[Any], Any]) -> pl.DataFrame:
+                       function: Callable[[Any], Any]) -> pl.Expr:
     """
     Map values in column to new values using function
 
-    Helper function for map_col
+    Helper function for map_col. The expression creates a struct with a field for each
+    new column. Numeric columns without nulls are mapped with `np.vectorize`, skipping
+    the conversion of each element by polars. The results of the function are
+    transposed into the new columns in a single pass. Nulls are not passed to the
+    function, but mapped to null in all new columns.
 
     :param df: The dataframe
-    :type df: pl.DataFrame
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
     :param col_name: the name of the column to map from
     :type col_name: str
     :param new_col_names: names of the new columns to be created as a result of the mapping
     :type new_col_names: List[str]
     :param function: a function to mapping with
     :type function: Callable[[Any], Any]
-    :return: the dataframe with the new column
-    :rtype: pl.DataFrame
+    :return: the expression creating the new columns
+    :rtype: pl.Expr
+    :raises: pl.ComputeError: wrapping a ValueError if function does not return a result
+        for each new column
+    """
+    def results(v: Any) -> Tuple[Any, ...]:
+        out = tuple(function(v))
+        _check_num_results(num_results=len(out), new_col_names=new_col_names)
+        return out
+
+    def transposed(s: pl.Series) -> pl.Series:
+        if s.dtype.is_numeric() and s.null_count() == 0:
+            rows = np.vectorize(results, otypes=[object])(s.to_numpy()).tolist()
+        else:
+            nulls = (None,) * len(new_col_names)
+            rows = [nulls if v is None else results(v) for v in s.to_list()]
+        columns = list(zip(*rows)) or [()] * len(new_col_names)
+        return pl.DataFrame(
+            {name: list(column) for name, column in zip(new_col_names, columns)}
+        ).to_struct(s.name)
+
+    return pl.col(col_name).map_batches(transposed)
+
+
+def _check_num_results(num_results: int, new_col_names: List[str]) -> None:
     """
-    results = df[col_name].map_elements(function)
-    new_columns = {new_col_names[i]: [res[i] for res in results] for i in range(len(new_col_names))}
+    Check that a mapping function returned a result for each new column
 
-    return df.with_columns([pl.Series(name, values) for name, values in new_columns.items()])
+    :param num_results: the number of results returned by the mapping function
+    :type num_results: int
+    :param new_col_names: names of the new columns to be created as a result of the mapping
+    :type new_col_names: List[str]
+    :raises: ValueError: if the number of results differs from the number of new columns
+    """
+    if num_results != len(new_col_names):
+        raise ValueError(f'The mapping function returned {num_results} results, but '
+                         f'{len(new_col_names)} columns are mapped to: {new_col_names}.')
 
 
-def _map_nto1_function(df: pl.DataFrame,
+def _map_nto1_function(df: Union[pl.DataFrame, pl.LazyFrame],
                        col_names: List[str], new_col_name: str,
-                       function: Callable[[Any], Any]) -> pl.DataFrame:
+                       function: Callable[[Any], Any],
+                       jit: bool = False, unique_only: bool = False) -> pl.Expr:
     """
     Map values in multiple columns to new values using function
 
     Helper function for map_col
 
     :param df: The dataframe
-    :type df: pl.DataFrame
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
     :param col_names: the names of the columns to map from
     :type col_names: List[str]
     :param new_col_name: name of the new column to be created as a result of the mapping
     :type new_col_name: str
     :param function: a function to mapping with
     :type function: Callable[[Any], Any]
-    :return: the dataframe with the new column
-    :rtype: pl.DataFrame
+    :param jit: whether to compile the function with numba
+    :type jit: bool
+    :param unique_only: whether to call the function only on unique combinations of values
+    :type unique_only: bool
+    :return: the expression creating the new column
+    :rtype: pl.Expr
     """
-    return df.with_columns(
-        pl.struct(col_names).apply(function).alias(new_col_name)
-    )
+    if jit:
+        kernel = _jit_kernel(function, parallel=True)
+
+        def batched(s: pl.Series) -> pl.Series:
+            out = kernel(*[s.struct.field(c).to_numpy() for c in col_names])
+            return _mask_null_rows(out=pl.Series(out), s=s)
 
+        expr = pl.struct(col_names).map_batches(batched)
+    else:
+        expr = pl.struct(col_names).apply(function)
+
+    if unique_only:
+        expr = _map_unique(col_names=col_names, expr=expr)
+    return expr.alias(new_col_name)
+
+
+def _map_unique(col_names: List[str], expr: pl.Expr) -> pl.Expr:
+    """
+    Evaluate a mapping expression only on the unique values of the columns to map from
 
-def _map_ntom_function(df: pl.DataFrame,
+    Helper function for map_col. The results are joined back onto the values of the
+    columns, so the mapping function is called once per unique value instead of once
+    per row.
+
+    :param col_names: the names of the columns to map from
+    :type col_names: List[str]
+    :param expr: the expression mapping the columns to the new values
+    :type expr: pl.Expr
+    :return: the expression evaluating `expr` only on unique values
+    :rtype: pl.Expr
+    """
+    value_name = '__v'
+    while value_name in col_names:  # must not replace a column to map from
+        value_name += '_'
+
+    def memoized(s: pl.Series) -> pl.Series:
+        values = s.struct.unnest()
+        uniq = values.unique(maintain_order=True).with_columns(expr.alias(value_name))
+        return values.join(uniq, on=col_names, how='left', join_nulls=True)[value_name]
+
+    return pl.struct(col_names).map_batches(memoized)
+
+
+def _map_ntom_function(df: Union[pl.DataFrame, pl.LazyFrame],
                        col_names: List[str], new_col_names: List[str],
-                       function: Callable[[Any], Any]) -> pl.DataFrame:
+                       function: Callable[..., Tuple[np.ndarray, ...]],
+                       jit: bool = False) -> pl.Expr:
     """
     Map values in multiple columns to new values using function
 
-    Helper function for map_col
+    Helper function for map_col. The function is called once with a numpy array for
+    each column in `col_names` and returns a numpy array for each column in
+    `new_col_names`. Rows with a null input are set to null in all new columns. The
+    expression creates a struct with a field for each new column.
 
     :param df: The dataframe
-    :type df: pl.DataFrame
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
     :param col_names: the names of the columns to map from
     :type col_names: List[str]
     :param new_col_names: names of the new columns to be created as a result of the mapping
     :type new_col_names: List[str]
     :param function: a function to mapping with
+    :type function: Callable[..., Tuple[np.ndarray, ...]]
+    :param jit: whether to compile the function with numba
+    :type jit: bool
+    :return: the expression creating the new columns
+    :rtype: pl.Expr
+    :raises: pl.ComputeError: wrapping a ValueError if function does not return an array
+        for each new column
+    """
+    if jit:
+        function = _jit_kernel(function, parallel=True)
+
+    def batched(s: pl.Series) -> pl.Series:
+        out = function(*[s.struct.field(c).to_numpy() for c in col_names])
+        _check_num_results(num_results=len(out), new_col_names=new_col_names)
+        return pl.DataFrame({
+            name: _mask_null_rows(out=pl.Series(values), s=s)
+            for name, values in zip(new_col_names, out)
+        }).to_struct('__s')
+
+    return pl.struct(col_names).map_batches(batched)
+
+
+def _mask_null_rows(out: pl.Series, s: pl.Series) -> pl.Series:
+    """
+    Set the values of out to null in the rows where a field of s is null
+
+    Helper function for the functions mapping with numpy arrays, which receive NaN or an
+    arbitrary value for null inputs.
+
+    :param out: the result of the mapping function
+    :type out: pl.Series
+    :param s: the struct series with the columns mapped from
+    :type s: pl.Series
+    :return: out with nulls in the rows with null inputs
+    :rtype: pl.Series
+    """
+    valid = pl.Series([True] * len(s), dtype=pl.Boolean)
+    for field in s.struct.fields:
+        valid = valid & s.struct.field(field).is_not_null()
+    return out.zip_with(valid, pl.Series([None] * len(s), dtype=out.dtype))
+
+
+def as_batched(function: Callable[[Any], Any]) -> Callable[[pl.Series], pl.Series]:
+    """
+    Wrap a function taking a single value, so it can be used with `batched=True`
+
+    The wrapped function is vectorized with numpy. Like when mapping without
+    `batched=True`, nulls are not passed to the function, but mapped to null, and the
+    dtype of the result is inferred from all values returned by the function. This keeps
+    existing functions working, but is not faster than calling them per value. Prefer
+    writing functions that work on whole columns.
+
+    :param function: a function taking a single value
     :type function: Callable[[Any], Any]
-    :return: the dataframe with the new column
-    :rtype: pl.DataFrame
+    :return: a function taking a whole column
+    :rtype: Callable[[pl.Series], pl.Series]
+    """
+    vectorized = np.vectorize(function, otypes=[object])
+
+    @wraps(function)
+    def batched(s: pl.Series) -> pl.Series:
+        if s.is_empty():
+            return s
+        out = np.full(len(s), None, dtype=object)
+        out[s.is_not_null().to_numpy()] = vectorized(s.drop_nulls().to_numpy())
+        return pl.Series(s.name, out.tolist())
+
+    return batched
+
+
+@lru_cache(maxsize=32)
+def _jit_kernel(function: Callable[..., Any], parallel: bool = False) -> Callable[..., Any]:
+    """
+    Compile a mapping function with numba, falling back to the function if it fails
+
+    Helper function for map_col. numba compiles the function when it is first called.
+    If it cannot compile the function, the function is called without compiling it from
+    then on. Kernels are cached, so a function that cannot be compiled is only tried
+    once.
+
+    :param function: the function to compile
+    :type function: Callable[..., Any]
+    :param parallel: whether numba should parallelize the loops and array expressions of
+        the function
+    :type parallel: bool
+    :return: the compiled function, or the function if it cannot be compiled
+    :rtype: Callable[..., Any]
+    :raises: ImportError: if numba is not installed
+    """
+    compiled = _jit_compile(function, parallel=parallel)
+    from numba.core.errors import NumbaError
+    compilable = True
+
+    def kernel(*args: Any) -> Any:
+        nonlocal compilable
+        if compilable:
+            try:
+                return compiled(*args)
+            except NumbaError:
+                compilable = False
+        return function(*args)
+
+    return kernel
+
+
+@lru_cache(maxsize=32)
+def _jit_compile(function: Callable[..., Any], parallel: bool = False) -> Callable[..., Any]:
+    """
+    Compile a mapping function with numba
+
+    Helper function for map_col. The compiled function releases the GIL, so polars can
+    run it on multiple threads. Compiled functions are cached, so mapping with the same
+    function repeatedly only compiles it once.
+
+    :param function: the function to compile
+    :type function: Callable[..., Any]
+    :param parallel: whether numba should parallelize the loops and array expressions of
+        the function
+    :type parallel: bool
+    :return: the compiled function
+    :rtype: Callable[..., Any]
+    :raises: ImportError: if numba is not installed
     """
-    raise NotImplementedError
+    try:
+        import numba
+    except ImportError as e:
+        raise ImportError('Mapping with jit=True requires numba. '
+                          'Install it with `pip install polars_utils[jit]`.') from e
+    try:
+        return numba.njit(nogil=True, cache=True, parallel=parallel)(function)
+    except RuntimeError:  # functions without a source file, e.g. defined in a REPL
+        return numba.njit(nogil=True, parallel=parallel)(function)
+
+
+# helper and options to pass to it, by kind of mapping and types of map_from and map_to
+_DISPATCH = {
+    (dict, str, str): (_map_col_dict, ('default',)),
+    (abc.Callable, str, str): (_map_1to1_function,
+                               ('jit', 'batched', 'unique_only', 'translate')),
+    (abc.Callable, str, list): (_map_1ton_function, ()),
+    (abc.Callable, list, str): (_map_nto1_function, ('jit', 'unique_only')),
+    (abc.Callable, list, list): (_map_ntom_function, ('jit',)),
+}
@@ -0,0 +1,69 @@
+from typing import Union, List, Dict, Any, Callable, Tuple
+
+import polars as pl
+
+from .map_col import _map_expr, _with_mapped_columns
+
+MappingSpec = Union[
+    Tuple[Union[str, List[str]], Union[str, List[str]],
+          Union[Dict[Any, Any], Callable[[Any], Any]]],
+    Tuple[Union[str, List[str]], Union[str, List[str]],
+          Union[Dict[Any, Any], Callable[[Any], Any]], Any],
+]
+
+
+def map_cols(
+        df: Union[pl.DataFrame, pl.LazyFrame],
+        specs: List[MappingSpec],
+        jit: bool = False,
+        batched: bool = False,
+        unique_only: bool = False,
+        streaming: bool = False,
+        translate: bool = False) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """
+    Map values in multiple columns at once using dictionaries or mapping functions
+
+    Each mapping is specified as a tuple `(map_from, map_to, mapping)` or
+    `(map_from, map_to, mapping, default)`, with the same meaning as the arguments of
+    map_col. The expressions for all mappings are built first and evaluated in a single
+    query, so polars optimizes them together and runs them in parallel, instead of
+    running one query per mapping as when calling map_col repeatedly.
+
+    When df is a LazyFrame, the mappings are added to its query and a LazyFrame is
+    returned without collecting it.
+
+    As all mappings are evaluated on the dataframe that is passed in, a mapping cannot
+    map from a column created by another mapping in the same call.
+
+    Example:
+    ```map_cols(df, [('a', 'a_name', names), ('b', 'b_code', codes, -1)])```
+
+    :param df: The dataframe
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
+    :param specs: the mappings, as tuples of map_from, map_to, mapping and optionally
+        default
+    :type specs: List[MappingSpec]
+    :param jit: whether to compile the mapping functions with numba
+    :type jit: bool
+    :param batched: whether to call the mapping functions once with the whole column
+    :type batched: bool
+    :param unique_only: whether to call the mapping functions only on unique values
+    :type unique_only: bool
+    :param streaming: whether to run the mappings with the streaming engine, ignored if df
+        is lazy
+    :type streaming: bool
+    :param translate: whether to translate mapping functions doing arithmetic to expressions
+    :type translate: bool
+    :return: the dataframe with the new columns, lazy if df is lazy
+    :rtype: Union[pl.DataFrame, pl.LazyFrame]
+    :raises: ValueError: if a mapping cannot be built, see map_col
+    """
+    mapped = [
+        (_map_expr(df, *spec, jit=jit, batched=batched, unique_only=unique_only,
+                   translate=translate), spec[1])
+        for spec in specs
+    ]
+
+    if isinstance(df, pl.LazyFrame):
+        return _with_mapped_columns(df, mapped)
+    return _with_mapped_columns(df.lazy(), mapped).collect(streaming=streaming)
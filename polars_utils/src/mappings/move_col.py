@@ -1,19 +1,41 @@
+import operator
+from typing import Union
+
 import polars as pl
 
 
-def move_col(df: pl.DataFrame, col_from_id: int, col_to_id: id):
+def move_col(df: Union[pl.DataFrame, pl.LazyFrame], col_from_id: int, col_to_id: int,
+             lazy: bool = False) -> Union[pl.DataFrame, pl.LazyFrame]:
     """Moves a column by id, to reorder the columns of a dataframe
 
+    When moving several columns, pass a LazyFrame or `lazy=True`, so the reorderings
+    are fused into a single projection when the result is collected instead of
+    materializing a dataframe after each move.
+
+    Example:
+    ```move_col(df, 3, 0, lazy=True).pipe(move_col, 5, 1).collect()```
+
     :param df: the dataframe
-    :type df: pl.DataFrame
+    :type df: Union[pl.DataFrame, pl.LazyFrame]
     :param col_from_id: the id of the column to be moved
     :type col_from_id: int
     :param col_to_id: the new id the column will be moved to
     :type col_to_id: int
-    :return: the dataframe with reordered columns
-    :rtype: pl.DataFrame
+    :param lazy: whether to return a LazyFrame when df is a DataFrame
+    :type lazy: bool
+    :return: the dataframe with reordered columns, lazy if df is lazy or lazy is True
+    :rtype: Union[pl.DataFrame, pl.LazyFrame]
+    :raises: TypeError: if col_from_id or col_to_id is not an integer
+    :raises: IndexError: if col_from_id is out of range
     """
+    col_from_id, col_to_id = operator.index(col_from_id), operator.index(col_to_id)
     columns: list = df.columns
-    last_col = columns.pop(col_from_id)
-    columns.insert(col_to_id, last_col)
+    if not -len(columns) <= col_from_id < len(columns):
+        raise IndexError(f'col_from_id {col_from_id} is out of range for '
+                         f'{len(columns)} columns.')
+    col_from_id %= len(columns)
+    rest = columns[:col_from_id] + columns[col_from_id + 1:]
+    columns = rest[:col_to_id] + [columns[col_from_id]] + rest[col_to_id:]
+    if lazy and isinstance(df, pl.DataFrame):
+        df = df.lazy()
     return df.select(columns)
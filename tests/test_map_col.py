@@ -0,0 +1,352 @@
+import fractions
+import functools
+import math
+
+import numpy as np
+import polars as pl
+import pytest
+
+from polars_utils import map_col, as_batched, clear_mapping_cache
+from polars_utils.src.mappings.map_col import _expr_from_function
+
+
+def lookup(df: pl.DataFrame, col_name: str, dictionary: dict, default=None) -> list:
+    """Map a column the way a Python dictionary does, nulls map to the default"""
+    return [default if value is None else dictionary.get(value, default)
+            for value in df[col_name].to_list()]
+
+
+def apply(df: pl.DataFrame, col_name: str, function) -> pl.Series:
+    """Map a column with a function called per value"""
+    return df.select(pl.col(col_name).apply(function))[col_name]
+
+
+def doubled(function):
+    @functools.wraps(function)
+    def wrapper(x):
+        return 2 * function(x)
+    return wrapper
+
+
+@doubled
+def plus_one_doubled(x):
+    return x + 1
+
+
+def times_two_minus_one(x):
+    return x * 2 - 1
+
+
+@pytest.fixture
+def df() -> pl.DataFrame:
+    return pl.DataFrame({
+        'i': [0, 1, 2, None, 5],
+        'f': [1.0, -2.0, 3.0, None, 4.5],
+        's': ['a', 'b', None, 'a', 'c'],
+    })
+
+
+@pytest.mark.parametrize('dictionary, default', [
+    ({0: 'x', 1: 'y', 2: 'z'}, None),  # contiguous keys, looked up by position
+    ({0: 'x', 1: 'y', 2: 'z'}, '?'),
+    ({5: 10, 0: 20}, -1),
+    ({1: 1.5, 2: 2.5}, 0.0),
+    ({}, 'empty'),
+])
+def test_map_int_col_with_dict(df, dictionary, default):
+    result = map_col(df, 'i', 'o', dictionary, default=default)['o']
+    assert result.to_list() == lookup(df, 'i', dictionary, default)
+
+
+@pytest.mark.parametrize('dictionary, dtype', [
+    ({1: 'a', 2: 'b', 3: 'c'}, pl.Int8),
+    ({126: 'a', 127: 'b', 128: 'c'}, pl.Int8),  # 128 does not fit into Int8 and is dropped
+    ({-1: 'a', 0: 'b', 1: 'c'}, pl.UInt8),
+    ({True: 't', 2: 'two'}, pl.Int8),
+])
+def test_map_range_out_of_bounds(dictionary, dtype):
+    df = pl.DataFrame({'i': pl.Series([0, 1, 2, 3, 100, 127, None], dtype=dtype)})
+    result = map_col(df, 'i', 'o', dictionary, default='-')['o']
+    assert result.to_list() == lookup(df, 'i', dictionary, '-')
+
+
+@pytest.mark.parametrize('dictionary', [{'a': 1, 'b': 2}, {'a': 1, 2: 2, None: 3}])
+def test_map_local_categorical_col_with_dict(dictionary):
+    df = pl.DataFrame({'s': ['a', '2', None, 'b']})
+    categorical = df.with_columns(pl.col('s').cast(pl.Categorical))
+    result = map_col(categorical, 's', 'o', dictionary, default=-1)['o']
+    assert result.to_list() == lookup(df, 's', dictionary, -1)
+
+
+@pytest.mark.parametrize('dictionary', [{'a': 1, 'b': 2}, {'a': 1, 2: 2, None: 3}])
+def test_map_global_categorical_col_with_dict(dictionary):
+    df = pl.DataFrame({'s': ['a', '2', None, 'b']})
+    with pl.StringCache():
+        categorical = df.with_columns(pl.col('s').cast(pl.Categorical))
+        result = map_col(categorical, 's', 'o', dictionary, default=-1)['o']
+    assert result.to_list() == lookup(df, 's', dictionary, -1)
+
+
+def test_map_str_col_with_dict(df):
+    dictionary = {'a': 1, 'c': 3}
+    result = map_col(df, 's', 'o', dictionary, default=0)['o']
+    assert result.to_list() == lookup(df, 's', dictionary, 0)
+
+
+@pytest.mark.parametrize('dictionary', [
+    {0.0: 'z', 1.0: 'o'},
+    {0.5: 'h', 1: 'o', 10 ** 30: 'big'},
+    {True: 't', 2: 'two'},
+])
+def test_map_int_col_with_keys_of_other_types(df, dictionary):
+    result = map_col(df, 'i', 'o', dictionary, default='-')['o']
+    assert result.to_list() == lookup(df, 'i', dictionary, '-')
+
+
+def test_map_str_col_with_keys_of_other_types():
+    df = pl.DataFrame({'a': ['1', 'x', None]})
+    result = map_col(df, 'a', 'o', {1: 'one', 'x': 'ex'})['o']
+    assert result.to_list() == [None, 'ex', None]
+
+
+def test_map_with_none_key_maps_nulls_to_default(df):
+    dictionary = {None: 'null', 'a': 'A'}
+    result = map_col(df, 's', 'o', dictionary, default='-')['o']
+    assert result.to_list() == lookup(df, 's', dictionary, '-')
+
+
+@pytest.mark.parametrize('values', [(1, 0), (True, False), (1.0, 0.0), ('1', '0')])
+def test_map_with_dict_keeps_value_dtype_across_calls(df, values):
+    map_col(df, 'i', 'o', {0: 1, 5: 0})  # caches the mapping with Int64 values
+    dictionary = dict(zip((0, 5), values))
+    result = map_col(df, 'i', 'o', dictionary)['o']
+    assert result.dtype == pl.Series(values).dtype
+    assert result.to_list() == lookup(df, 'i', dictionary)
+
+
+def test_map_with_unhashable_values(df):
+    dictionary = {0: [1, 2], 1: [3]}
+    assert map_col(df, 'i', 'o', dictionary)['o'].to_list() == [[1, 2], [3], None, None, None]
+
+
+def test_clear_mapping_cache(df):
+    dictionary = {0: 'x', 1: 'y'}
+    first = map_col(df, 'i', 'o', dictionary)['o']
+    clear_mapping_cache()
+    assert map_col(df, 'i', 'o', dictionary)['o'].to_list() == first.to_list()
+
+
+def test_map_with_jit(df):
+    pytest.importorskip('numba')
+    result = map_col(df.drop_nulls(), 'f', 'o', lambda x: x * 2.0, jit=True)['o']
+    assert result.to_list() == [2.0, -4.0, 9.0]
+
+
+def test_map_with_jit_falls_back_to_function(df):
+    pytest.importorskip('numba')
+    function = lambda x: str(fractions.Fraction(x, 3))  # noqa: E731
+    result = map_col(df.drop_nulls(), 'i', 'o', function, jit=True)['o']
+    assert result.to_list() == ['0', '1/3', '5/3']
+
+
+def test_map_n_to_1_with_jit_keeps_nulls(df):
+    pytest.importorskip('numba')
+    result = map_col(df, ['i', 'f'], 'o', lambda a, b: a * 2 + b, jit=True)['o']
+    assert result.to_list() == [1.0, 0.0, 7.0, None, 14.5]
+
+
+def test_map_n_to_m_with_jit(df):
+    pytest.importorskip('numba')
+    result = map_col(df, ['i', 'f'], ['a', 'b'], lambda i, f: (i + f, i * f), jit=True)
+    assert result['a'].to_list() == [1.0, -1.0, 5.0, None, 9.5]
+    assert result['b'].to_list() == [0.0, -2.0, 6.0, None, 22.5]
+
+
+def test_map_with_function_batched(df):
+    result = map_col(df, 'f', 'o', lambda s: s * 2, batched=True)['o']
+    assert result.to_list() == [2.0, -4.0, 6.0, None, 9.0]
+
+
+@pytest.mark.parametrize('col_name, function, expected', [
+    ('s', lambda v: v + '!', ['a!', 'b!', None, 'a!', 'c!']),
+    ('i', lambda v: str(v), ['0', '1', '2', None, '5']),
+    ('i', lambda v: v / 2 if v > 0 else 0, [0.0, 0.5, 1.0, None, 2.5]),
+])
+def test_as_batched(df, col_name, function, expected):
+    result = map_col(df, col_name, 'o', as_batched(function), batched=True)['o']
+    assert result.to_list() == expected
+
+
+def test_as_batched_empty(df):
+    result = map_col(df.clear(), 'i', 'o', as_batched(lambda v: v + 1), batched=True)
+    assert result.is_empty()
+
+
+def test_map_1_to_n(df):
+    result = map_col(df, 'i', ['a', 'b'], lambda x: (x, str(x)))
+    assert result['a'].to_list() == [0, 1, 2, None, 5]
+    assert result['b'].to_list() == ['0', '1', '2', None, '5']
+
+
+def test_map_1_to_n_replaces_existing_col(df):
+    result = map_col(df, 'f', ['f', 'g'], lambda x: [x + 1, x * 2])
+    assert result.columns == ['i', 'f', 's', 'g']
+    assert result['f'].to_list() == [2.0, -1.0, 4.0, None, 5.5]
+    assert result['g'].to_list() == [2.0, -4.0, 6.0, None, 9.0]
+
+
+def test_map_1_to_n_numeric_without_nulls(df):
+    result = map_col(df.drop_nulls(), 'f', ['a', 'b'], lambda x: (x * 2, x > 0))
+    assert result['a'].to_list() == [2.0, -4.0, 9.0]
+    assert result['b'].to_list() == [True, False, True]
+
+
+def test_map_1_to_n_numeric_with_too_many_results(df):
+    with pytest.raises(pl.ComputeError, match='returned 3 results, but 2 columns'):
+        map_col(df.drop_nulls(), 'i', ['a', 'b'], lambda x: (x, x, x))
+
+
+def test_map_1_to_n_empty(df):
+    result = map_col(df.clear(), 'i', ['a', 'b'], lambda x: (x, x))
+    assert result.columns == ['i', 'f', 's', 'a', 'b']
+    assert result.is_empty()
+
+
+def test_map_1_to_n_with_too_few_results(df):
+    with pytest.raises(pl.ComputeError, match='returned 1 results, but 2 columns'):
+        map_col(df, 'i', ['a', 'b'], lambda x: (x,))
+
+
+def test_map_n_to_m(df):
+    result = map_col(df, ['i', 'f'], ['a', 'b'], lambda i, f: (i + f, i * f))
+    assert result['a'].to_list() == [1.0, -1.0, 5.0, None, 9.5]
+    assert result['b'].to_list() == [0.0, -2.0, 6.0, None, 22.5]
+
+
+def test_map_n_to_m_with_too_few_results(df):
+    with pytest.raises(pl.ComputeError, match='returned 1 results, but 2 columns'):
+        map_col(df, ['i', 'f'], ['a', 'b'], lambda i, f: (i + f,))
+
+
+def test_map_lazy_chained(df):
+    result = map_col(df.lazy(), 'i', 'a', {0: 10, 1: 11}).pipe(map_col, 'a', 'b', lambda x: x + 1)
+    assert isinstance(result, pl.LazyFrame)
+    assert result.collect()['b'].to_list() == [11, 12, None, None, None]
+
+
+def test_map_1_to_n_replaces_existing_col_lazily(df):
+    result = map_col(df.lazy(), 'f', ['f', 'g'], lambda x: [x + 1, x * 2])
+    assert isinstance(result, pl.LazyFrame)
+    result = result.collect()
+    assert result.columns == ['i', 'f', 's', 'g']
+    assert result['f'].to_list() == [2.0, -1.0, 4.0, None, 5.5]
+    assert result['g'].to_list() == [2.0, -4.0, 6.0, None, 9.0]
+
+
+def test_map_streaming(df):
+    result = map_col(df, 'i', 'o', {0: 'x'}, streaming=True)
+    assert isinstance(result, pl.DataFrame)
+    assert result['o'].to_list() == ['x', None, None, None, None]
+
+
+def test_map_1_to_n_streaming(df):
+    result = map_col(df, 'f', ['f', 'g'], lambda x: [x + 1, x * 2], streaming=True)
+    assert result.columns == ['i', 'f', 's', 'g']
+    assert result['g'].to_list() == [2.0, -4.0, 6.0, None, 9.0]
+
+
+@pytest.mark.parametrize('col_name, function', [
+    ('i', lambda x: x * 2 + 1),
+    ('i', times_two_minus_one),
+    ('i', plus_one_doubled),
+    ('i', abs),
+    ('f', lambda x: math.sqrt(abs(x)) - 1),
+    ('f', lambda x: -np.exp(x) * 0.5),
+    ('s', lambda x: x * 2),  # not numeric, so the function is called
+    ('i', lambda x: str(x)),  # cannot be translated, so the function is called
+])
+def test_map_with_translated_function(df, col_name, function):
+    result = map_col(df, col_name, 'o', function, translate=True)['o']
+    expected = apply(df, col_name, function)
+    assert result.dtype == expected.dtype
+    assert result.to_list() == pytest.approx(expected.to_list())
+
+
+def test_translate_only_undecorated_functions(df):
+    assert _expr_from_function(df, 'i', lambda x: x * 2 + 1) is not None
+    assert _expr_from_function(df, 'i', times_two_minus_one) is not None
+    assert _expr_from_function(df, 'i', plus_one_doubled) is None
+
+
+@pytest.mark.parametrize('function', [
+    lambda x: x + 10 ** 30,  # does not fit into Int64
+    lambda x: x * 2 ** 62 * 4,
+    lambda x: x + 1 / 0,  # raises when the expression is built
+])
+def test_translate_constants_outside_int64(df, function):
+    assert _expr_from_function(df, 'i', function) is None
+
+
+@pytest.mark.parametrize('dtype, values, function', [
+    (pl.UInt8, [0, 255], lambda x: x + 1),
+    (pl.UInt8, [0, 255], lambda x: x - 1),
+    (pl.UInt8, [0, 255], lambda x: -x),
+    (pl.Int32, [0, 2 ** 31 - 1], lambda x: x * 2),
+    (pl.Int64, [-2 ** 40, 3, 2 ** 40], lambda x: x * 3 - 7),
+    (pl.Float32, [0.5, 1.5], lambda x: x / 3),
+])
+def test_translated_function_does_not_overflow(dtype, values, function):
+    df = pl.DataFrame({'x': pl.Series(values, dtype=dtype)})
+    result = map_col(df, 'x', 'o', function, translate=True)['o']
+    assert result.to_list() == apply(df, 'x', function).to_list()
+
+
+def test_translated_function_wraps_around_int64():
+    df = pl.DataFrame({'x': [2 ** 62, -3]})
+    result = map_col(df, 'x', 'o', lambda x: x * 4, translate=True)['o']
+    assert result.to_list() == [0, -12]
+
+
+def test_map_with_function_is_not_translated_by_default(df):
+    calls = []
+    map_col(df, 'i', 'o', lambda x: calls.append(x) or x * 2)
+    assert calls == [0, 1, 2, 5]
+
+
+def test_map_with_function_unique_only(df):
+    function = lambda x: x + '!'  # noqa: E731
+    for _ in range(20):  # the order of unique values must not depend on hashing
+        result = map_col(df, 's', 'o', function, unique_only=True)['o']
+        assert result.to_list() == ['a!', 'b!', None, 'a!', 'c!']
+
+
+def test_map_unique_only_with_col_named_like_result(df):
+    df = df.rename({'i': '__v'})
+    result = map_col(df, '__v', 'o', lambda x: x * 10, unique_only=True)['o']
+    assert result.to_list() == [0, 10, 20, None, 50]
+
+
+def test_map_multiple_cols_unique_only(df):
+    function = lambda r: f"{r['s']}{r['i']}"  # noqa: E731
+    result = map_col(df, ['s', 'i'], 'o', function, unique_only=True)['o']
+    assert result.to_list() == map_col(df, ['s', 'i'], 'o', function)['o'].to_list()
+
+
+@pytest.mark.parametrize('map_from, map_to, mapping', [
+    ('i', 'o', 'not a mapping'),
+    (('i',), 'o', lambda x: x),
+    ('i', 1, lambda x: x),
+    (['i', 'f'], 'o', {0: 1}),
+])
+def test_map_col_with_invalid_types(df, map_from, map_to, mapping):
+    with pytest.raises(ValueError):
+        map_col(df, map_from, map_to, mapping)
+
+
+class ColNames(list):
+    pass
+
+
+def test_map_col_with_subclasses_of_str_and_list(df):
+    result = map_col(df, np.str_('i'), ColNames(['a', 'b']), lambda x: (x, x))
+    assert result['b'].to_list() == df['i'].to_list()
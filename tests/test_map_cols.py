@@ -0,0 +1,49 @@
+import polars as pl
+import pytest
+
+from polars_utils import map_col, map_cols
+
+
+@pytest.fixture
+def df() -> pl.DataFrame:
+    return pl.DataFrame({
+        'i': [0, 1, 2, None],
+        's': ['a', 'b', None, 'a'],
+    })
+
+
+def test_map_cols_matches_map_col(df):
+    specs = [
+        ('i', 'a', {0: 'x', 1: 'y'}),
+        ('s', 'b', {'a': 1}, -1),
+        ('i', ['c', 'd'], lambda x: (x, x * 2)),
+        (['i', 's'], 'e', lambda r: f"{r['s']}{r['i']}"),
+    ]
+    expected = df
+    for spec in specs:
+        expected = map_col(expected, *spec)
+    assert map_cols(df, specs).to_dicts() == expected.to_dicts()
+
+
+def test_map_cols_lazy(df):
+    result = map_cols(df.lazy(), [('i', 'i', {0: 10}), ('s', 'o', lambda x: x * 2)])
+    assert isinstance(result, pl.LazyFrame)
+    result = result.collect()
+    assert result['i'].to_list() == [10, None, None, None]
+    assert result['o'].to_list() == ['aa', 'bb', None, 'aa']
+
+
+def test_map_cols_from_original_cols(df):
+    result = map_cols(df, [('i', 'i', {0: 10, 1: 11}), ('i', 'o', {0: 'x'})])
+    assert result['i'].to_list() == [10, 11, None, None]
+    assert result['o'].to_list() == ['x', None, None, None]
+
+
+def test_map_cols_translate(df):
+    result = map_cols(df, [('i', 'o', lambda x: x * 2)], translate=True)
+    assert result['o'].to_list() == [0, 2, 4, None]
+
+
+def test_map_cols_invalid_spec(df):
+    with pytest.raises(ValueError):
+        map_cols(df, [('i', 'o', 5)])
@@ -0,0 +1,45 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from polars_utils import move_col
+
+
+@pytest.fixture
+def df() -> pl.DataFrame:
+    return pl.DataFrame({'a': [1], 'b': [2], 'c': [3], 'd': [4]})
+
+
+@pytest.mark.parametrize('col_from_id, col_to_id, columns', [
+    (3, 0, ['d', 'a', 'b', 'c']),
+    (0, 3, ['b', 'c', 'd', 'a']),
+    (1, 1, ['a', 'b', 'c', 'd']),
+    (-1, 1, ['a', 'd', 'b', 'c']),
+])
+def test_move_col(df, col_from_id, col_to_id, columns):
+    result = move_col(df, col_from_id, col_to_id)
+    assert isinstance(result, pl.DataFrame)
+    assert result.columns == columns
+    assert result.row(0) == tuple(df[col].item() for col in columns)
+
+
+def test_move_col_lazy(df):
+    result = move_col(df, 3, 0, lazy=True).pipe(move_col, 3, 1)
+    assert isinstance(result, pl.LazyFrame)
+    assert result.collect().columns == ['d', 'c', 'a', 'b']
+
+
+def test_move_col_with_numpy_ints(df):
+    result = move_col(df, np.int64(3), np.int64(0))
+    assert result.columns == ['d', 'a', 'b', 'c']
+
+
+@pytest.mark.parametrize('col_from_id, col_to_id, error', [
+    (4, 0, IndexError),
+    (-5, 0, IndexError),
+    ('a', 0, TypeError),
+    (0, 1.0, TypeError),
+])
+def test_move_col_invalid_ids(df, col_from_id, col_to_id, error):
+    with pytest.raises(error):
+        move_col(df, col_from_id, col_to_id)